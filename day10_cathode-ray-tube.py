@@ -1,33 +1,16 @@
-from dataclasses import dataclass, field
-from enum import Enum
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from enum import IntEnum
+from itertools import chain, islice
 
 from file import read_lines
 
 
-class State(Enum):
-    PENDING = 1
-    RUNNING = 2
-    FINISHED = 3
-
-
-@dataclass
+@dataclass(frozen=True)
 class Instruction:
     n_cycles: int
     value: int
-    state: State = State.PENDING
-    _i_cycle: int = field(default=0, init=False)
-
-    def start(self):
-        if self.state is not State.PENDING:
-            raise RuntimeError
-        self.state = State.RUNNING
-
-    def advance(self):
-        if self.state is not State.RUNNING:
-            raise RuntimeError
-        self._i_cycle += 1
-        if self._i_cycle == self.n_cycles:
-            self.state = State.FINISHED
 
 
 def parse_lines(lines):
@@ -39,17 +22,45 @@ def parse_lines(lines):
             yield Instruction(n_cycles=1, value=0)
 
 
+class Timeline:
+    def __init__(self, instructions, initial):
+        self.starts = array("q", [1])
+        self.values = array("q", [initial])
+        i_cycle = 1
+        value = initial
+        for instruction in instructions:
+            i_cycle += instruction.n_cycles
+            if instruction.value:
+                value += instruction.value
+                self.starts.append(i_cycle)
+                self.values.append(value)
+        self.n_cycles = i_cycle - 1
+
+    def __getitem__(self, i_cycle):
+        if i_cycle < 1:
+            raise IndexError(i_cycle)
+        return self.values[bisect_right(self.starts, i_cycle) - 1]
+
+    def runs(self, first_cycle, last_cycle):
+        i = bisect_right(self.starts, first_cycle) - 1
+        ends = chain(islice(self.starts, i + 1, None), [last_cycle + 1])
+        for start, end, value in zip(islice(self.starts, i, None), ends, islice(self.values, i, None)):
+            yield max(start, first_cycle), min(end, last_cycle + 1), value
+            if end > last_cycle:
+                return
+
+    def register_values(self, n_cycles):
+        for start, end, value in self.runs(1, n_cycles):
+            for i_cycle in range(start, end):
+                yield i_cycle, value
+
+    def signal_strengths(self, cycles):
+        for i_cycle in cycles:
+            yield i_cycle, i_cycle * self[i_cycle]
+
+
 def compute_register_values(instructions, n_cycles, initial):
-    instruction = next(instructions)
-    for i_cycle in range(1, n_cycles + 1):
-        yield i_cycle, initial
-        if instruction.state is State.PENDING:
-            instruction.start()
-        if instruction.state is State.RUNNING:
-            instruction.advance()
-        if instruction.state is State.FINISHED:
-            initial += instruction.value
-            instruction = next(instructions)
+    yield from Timeline(instructions, initial).register_values(n_cycles)
 
 
 def compute_signal_strength(register_values):
@@ -63,42 +74,55 @@ def filter_signal_strengths(signal_strengths, cycles):
             yield i_cycle, signal_strength
 
 
-class Pixel(Enum):
-    DARK = 1
-    LIT = 2
+class Pixel(IntEnum):
+    DARK = 0
+    LIT = 1
+
+
+def render(timeline, width, height, first_cycle=1):
+    framebuffer = bytearray(width * height)
+    for start, end, sprite_position in timeline.runs(first_cycle, first_cycle + len(framebuffer) - 1):
+        i_pixel = start - first_cycle
+        stop = end - first_cycle
+        while i_pixel < stop:
+            row_start = i_pixel - i_pixel % width
+            row_stop = min(row_start + width, stop)
+            lit_start = max(i_pixel, row_start + sprite_position - 1)
+            lit_stop = min(row_stop, row_start + sprite_position + 2)
+            if lit_start < lit_stop:
+                framebuffer[lit_start:lit_stop] = bytes([Pixel.LIT]) * (lit_stop - lit_start)
+            i_pixel = row_stop
+    return framebuffer
+
+
+def render_frames(timeline, width, height):
+    for first_cycle in range(1, timeline.n_cycles + 1, width * height):
+        yield render(timeline, width, height, first_cycle=first_cycle)
 
 
-def get_pixels(sprite_positions, height, width):
-    for _ in range(height):
-        for i_pixel in range(width):
-            _, sprite_position = next(sprite_positions)
-            if abs(sprite_position - i_pixel) < 2:
-                yield Pixel.LIT
-            else:
-                yield Pixel.DARK
+def stringify_rows(framebuffer, width, chars):
+    table = bytes.maketrans(bytes(chars), "".join(chars.values()).encode())
+    text = framebuffer.translate(table).decode()
+    for row_start in range(0, len(text), width):
+        yield text[row_start : row_start + width]
 
 
-def get_rows(pixels, width):
-    row = []
-    for i_pixel, pixel in enumerate(pixels, start=1):
-        row.append(pixel)
-        if i_pixel % width == 0:
-            yield row
-            row = []
+def to_pgm(framebuffer, width, height):
+    return b"P5\n%d %d\n1\n" % (width, height) + bytes(framebuffer)
 
 
-def stringify_rows(rows, chars):
-    for row in rows:
-        yield "".join(chars[p] for p in row)
+def to_pbm(framebuffer, width, height):
+    n_bytes = (width + 7) // 8
+    bits = framebuffer.translate(bytes.maketrans(b"\x00\x01", b"01"))
+    rows = (int(bits[i : i + width].ljust(n_bytes * 8, b"0"), 2) for i in range(0, len(bits), width))
+    return b"P4\n%d %d\n" % (width, height) + b"".join(row.to_bytes(n_bytes, "big") for row in rows)
 
 
 if __name__ == "__main__":
     height = 6
     width = 40
     lines = read_lines("data/day10.txt")
-    instructions = parse_lines(lines)
-    register_values = compute_register_values(instructions, n_cycles=height * width, initial=1)
-    pixels = get_pixels(register_values, height=height, width=width)
-    rows = get_rows(pixels, width=width)
-    for row in stringify_rows(rows, {Pixel.DARK: ".", Pixel.LIT: "#"}):
+    timeline = Timeline(parse_lines(lines), initial=1)
+    framebuffer = render(timeline, width=width, height=height)
+    for row in stringify_rows(framebuffer, width, {Pixel.DARK: ".", Pixel.LIT: "#"}):
         print(row)
@@ -1,7 +1,13 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import operator
-from abc import ABC, abstractmethod
-from collections import deque
+from collections import Counter, deque
 from dataclasses import dataclass
+from functools import partial
+from itertools import chain
 from math import prod
 from typing import Callable
 
@@ -19,70 +25,20 @@ def parse_lines(lines):
     yield observation
 
 
-class Parser(ABC):
-
-    _next_parser = None
-
-    def set_next(self, parser):
-        self._next_parser = parser
-        return parser
-
-    @abstractmethod
-    def parse(self, line):
-        if self._next_parser:
-            return self._next_parser.parse(line)
-        return None
-
-
-class NumberParser(Parser):
-    def parse(self, line):
-        if line.startswith("Monkey"):
-            _, raw_number = line.split(" ")
-            return "number", int(raw_number[0])
-        return super().parse(line)
-
-
-class StartingItemsParser(Parser):
-    def parse(self, line):
-        if line.startswith("Starting items"):
-            _, raw_items = line.split(":")
-            return "items", deque(int(i) for i in raw_items.split(", "))
-        return super().parse(line)
-
+OPERATORS = {"*": operator.mul, "+": operator.add}
 
-class OperationParser(Parser):
-    _operator_map = {"*": operator.mul, "+": operator.add}
 
-    def parse(self, line):
-        if line.startswith("Operation"):
-            _, raw_operation = line.split(":")
-            _, right_hand_side = raw_operation.split("=")
-            _, op, right = right_hand_side.strip().split(" ")
+def compile_operation(op, right):
+    if right != "old":
+        return partial(OPERATORS[op], int(right))
+    if op == "*":
+        return partial(pow, exp=2)
+    return partial(operator.mul, 2)
 
-            def operation(old):
-                if right == "old":
-                    return self._operator_map[op](old, old)
-                return self._operator_map[op](old, int(right))
 
-            return "operation", operation
-        return super().parse(line)
-
-
-class TestParser(Parser):
-    def parse(self, line):
-        if line.startswith("Test"):
-            *_, raw_value = line.split(" ")
-            return "test", int(raw_value)
-        return super().parse(line)
-
-
-class ConditionParser(Parser):
-    def parse(self, line):
-        if line.startswith("If"):
-            _, raw_condition, *_, raw_value = line.split(" ")
-            condition = raw_condition.split(":")[0]
-            return condition, int(raw_value)
-        return super().parse(line)
+def parse_value(line):
+    *_, raw_value = line.rstrip(":").split(" ")
+    return int(raw_value)
 
 
 @dataclass
@@ -113,16 +69,18 @@ class Monkey:
 
 
 def parse_observations(raw_observations):
-    parser = NumberParser()
-    parser.set_next(StartingItemsParser()).set_next(OperationParser()).set_next(TestParser()).set_next(
-        ConditionParser()
-    )
-    for raw_observation in raw_observations:
-        observation = {}
-        for line in raw_observation:
-            attribute, value = parser.parse(line)
-            observation[attribute] = value
-        yield Monkey(**observation)
+    for raw_number, raw_items, raw_operation, raw_test, raw_true, raw_false in raw_observations:
+        _, raw_items = raw_items.split(":")
+        _, right_hand_side = raw_operation.split("=")
+        _, op, right = right_hand_side.strip().split(" ")
+        yield Monkey(
+            number=parse_value(raw_number),
+            items=deque(int(i) for i in raw_items.split(", ")),
+            operation=compile_operation(op, right),
+            test=parse_value(raw_test),
+            true=parse_value(raw_true),
+            false=parse_value(raw_false),
+        )
 
 
 def play_rounds(troop, n_rounds):
@@ -137,12 +95,83 @@ def play_rounds(troop, n_rounds):
         yield troop
 
 
+def play_rounds_array(troop, n_rounds):
+    if np is None:
+        for troop in play_rounds(troop, n_rounds):
+            pass
+        return troop
+    prime = prod(m.test for m in troop.values())
+    # Every operation grows with the worry level, so the largest residue gives each one's largest result.
+    worst = max(m.operation(prime - 1) for m in troop.values())
+    if worst >= 2**63:
+        raise ValueError(f"Worry levels up to {worst} do not fit into int64 arrays")
+    index = {number: i for i, number in enumerate(troop)}
+    monkeys = list(troop.values())
+    held = [[np.fromiter(m.items, dtype=np.int64, count=len(m.items)) % prime] for m in monkeys]
+    n_inspections = np.zeros(len(monkeys), dtype=np.int64)
+    for _ in range(n_rounds):
+        for i, monkey in enumerate(monkeys):
+            items = np.concatenate(held[i]) if len(held[i]) > 1 else held[i][0]
+            held[i] = [items[:0]]
+            if not len(items):
+                continue
+            n_inspections[i] += len(items)
+            items = monkey.operation(items) % prime
+            divisible = items % monkey.test == 0
+            held[index[monkey.true]].append(items[divisible])
+            held[index[monkey.false]].append(items[~divisible])
+    for i, monkey in enumerate(monkeys):
+        monkey.items = deque(np.concatenate(held[i]).tolist())
+        monkey.n_inspections += int(n_inspections[i])
+    return troop
+
+
+def trace_item(troop, order, holder, worry, prime, n_rounds):
+    seen = {}
+    states = []
+    inspections = []
+    while len(states) < n_rounds and (holder, worry) not in seen:
+        seen[holder, worry] = len(states)
+        states.append((holder, worry))
+        inspected = []
+        while True:
+            monkey = troop[holder]
+            inspected.append(holder)
+            worry = monkey.operation(worry) % prime
+            target = monkey.decide(worry)
+            passed_on = order[target] > order[holder]
+            holder = target
+            if not passed_on:
+                break
+        inspections.append(inspected)
+    if len(states) == n_rounds:
+        return (holder, worry), Counter(chain.from_iterable(inspections))
+    start = seen[holder, worry]
+    n_cycles, remainder = divmod(n_rounds - start, len(states) - start)
+    counts = Counter(chain.from_iterable(inspections[:start] + inspections[start : start + remainder]))
+    for number, count in Counter(chain.from_iterable(inspections[start:])).items():
+        counts[number] += n_cycles * count
+    return states[start + remainder], counts
+
+
+def fast_forward_rounds(troop, n_rounds):
+    prime = prod(m.test for m in troop.values())
+    order = {number: i for i, number in enumerate(troop)}
+    items = [(monkey.number, item % prime) for monkey in troop.values() for item in monkey]
+    for monkey in troop.values():
+        monkey.items.clear()
+    for holder, worry in items:
+        (holder, worry), counts = trace_item(troop, order, holder, worry, prime, n_rounds)
+        for number, count in counts.items():
+            troop[number].n_inspections += count
+        troop[holder].catch(worry)
+    return troop
+
+
 if __name__ == "__main__":
     lines = read_lines("data/day11.txt")
     raw_observations = parse_lines(lines)
     monkeys = parse_observations(raw_observations)
     troop = {m.number: m for m in monkeys}
-    troop = play_rounds(troop, 10_000)
-    for troop in troop:
-        pass
+    troop = fast_forward_rounds(troop, 10_000)
     print(prod(sorted([m.n_inspections for m in troop.values()])[-2:]))
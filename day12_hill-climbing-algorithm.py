@@ -1,98 +1,227 @@
+from array import array
 from collections import deque
 from dataclasses import dataclass
+from heapq import heappop, heappush
 from string import ascii_lowercase
 
 from file import read_lines
 
+HEIGHTS = bytes.maketrans(b"SE" + ascii_lowercase.encode(), bytes([0, 25]) + bytes(range(26)))
+
 
 @dataclass(frozen=True)
 class Position:
     row: int
     column: int
 
-    @property
-    def neighbors(self):
-        for value in [-1, 1]:
-            yield Position(self.row + value, self.column)
-            yield Position(self.row, self.column + value)
-
 
 class Grid:
     def __init__(self, grid):
-        self._grid = list(list(r) for r in grid)
+        self.data = bytearray()
+        self.n_columns = 0
+        for row in grid:
+            if isinstance(row, str):
+                row = row.encode()
+            self.n_columns = self.n_columns or len(row)
+            self.data += row
+
+    def __len__(self):
+        return len(self.data)
 
-    def __getitem__(self, position):
-        if position.row < 0 or position.column < 0:
-            raise IndexError
-        return self._grid[position.row][position.column]
+    def __getitem__(self, index):
+        return chr(self.data[index])
 
-    def __setitem__(self, position, value):
-        self._grid[position.row][position.column] = value
+    def __setitem__(self, index, value):
+        self.data[index] = ord(value)
 
     def __str__(self):
-        rows = ("".join(r) for r in self._grid)
+        rows = (self.data[i : i + self.n_columns].decode() for i in range(0, len(self), self.n_columns))
         return "\n".join(rows)
 
     @property
     def size(self):
-        return len(self._grid), len(self._grid[0])
+        return len(self) // self.n_columns, self.n_columns
 
-    @property
-    def positions(self):
+    def index(self, position):
         n_rows, n_columns = self.size
-        for i_row in range(n_rows):
-            for i_column in range(n_columns):
-                yield Position(i_row, i_column)
+        if not (0 <= position.row < n_rows and 0 <= position.column < n_columns):
+            raise IndexError(position)
+        return position.row * n_columns + position.column
+
+    def position(self, index):
+        return Position(*divmod(index, self.n_columns))
 
     def find(self, token):
-        return (p for p in self.positions if self[p] == token)
+        value = ord(token)
+        index = self.data.find(value)
+        while index != -1:
+            yield index
+            index = self.data.find(value, index + 1)
 
 
 class HeightMap:
     def __init__(self, grid):
         self.grid = grid
-
-    def get_possible_destinations(self, position):
-        current_height = ascii_lowercase.index(self.grid[position])
-        for destination in position.neighbors:
-            try:
-                raw_height = self.grid[destination]
-            except IndexError:
-                continue
-            destination_height = ascii_lowercase.index(raw_height)
-            if destination_height - current_height <= 1:
+        self.heights = bytes(grid.data).translate(HEIGHTS)
+        self.n_columns = grid.n_columns
+
+    def __len__(self):
+        return len(self.heights)
+
+    def neighbors(self, index):
+        if index >= self.n_columns:
+            yield index - self.n_columns
+        if index + self.n_columns < len(self.heights):
+            yield index + self.n_columns
+        if index % self.n_columns:
+            yield index - 1
+        if (index + 1) % self.n_columns:
+            yield index + 1
+
+    def get_possible_destinations(self, index):
+        highest = self.heights[index] + 1
+        for destination in self.neighbors(index):
+            if self.heights[destination] <= highest:
                 yield destination
 
+    def get_possible_origins(self, index):
+        lowest = self.heights[index] - 1
+        for origin in self.neighbors(index):
+            if self.heights[origin] >= lowest:
+                yield origin
+
+    def estimate(self, index, end):
+        row, column = divmod(index, self.n_columns)
+        end_row, end_column = divmod(end, self.n_columns)
+        return max(abs(end_row - row) + abs(end_column - column), self.heights[end] - self.heights[index])
+
+    def find_path(self, start, end, strategy="bfs"):
+        if not callable(strategy):
+            strategy = STRATEGIES[strategy]
+        return strategy(self, start, end)
+
 
 def compute_n_steps(height_map, start, end):
-    queue = deque()
-    explored = set()
-    explored.add(start)
-    queue.append(start)
-    parents = {}
+    distances = array("i", [-1]) * len(height_map)
+    distances[start] = 0
+    queue = deque([start])
     while queue:
         current = queue.popleft()
         if current == end:
-            n_steps = 0
-            while True:
-                try:
-                    current = parents[current]
-                except KeyError:
-                    return n_steps
-                n_steps += 1
+            return distances[current]
         for destination in height_map.get_possible_destinations(current):
-            if destination not in explored:
-                explored.add(destination)
+            if distances[destination] < 0:
+                distances[destination] = distances[current] + 1
+                queue.append(destination)
+    return None
+
+
+def compute_distances(height_map, end):
+    distances = array("i", [-1]) * len(height_map)
+    distances[end] = 0
+    queue = deque([end])
+    while queue:
+        current = queue.popleft()
+        for origin in height_map.get_possible_origins(current):
+            if distances[origin] < 0:
+                distances[origin] = distances[current] + 1
+                queue.append(origin)
+    return distances
+
+
+def trace_path(parents, end):
+    path = [end]
+    while parents[path[-1]] != path[-1]:
+        path.append(parents[path[-1]])
+    path.reverse()
+    return path
+
+
+def breadth_first_path(height_map, start, end):
+    parents = array("i", [-1]) * len(height_map)
+    parents[start] = start
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        if current == end:
+            return trace_path(parents, end)
+        for destination in height_map.get_possible_destinations(current):
+            if parents[destination] < 0:
                 parents[destination] = current
                 queue.append(destination)
+    return None
+
+
+def a_star_path(height_map, start, end):
+    parents = array("i", [-1]) * len(height_map)
+    distances = array("i", [-1]) * len(height_map)
+    closed = bytearray(len(height_map))
+    parents[start] = start
+    distances[start] = 0
+    queue = [(height_map.estimate(start, end), start)]
+    while queue:
+        _, current = heappop(queue)
+        if current == end:
+            return trace_path(parents, end)
+        if closed[current]:
+            continue
+        closed[current] = 1
+        distance = distances[current] + 1
+        for destination in height_map.get_possible_destinations(current):
+            if distances[destination] < 0 or distance < distances[destination]:
+                distances[destination] = distance
+                parents[destination] = current
+                heappush(queue, (distance + height_map.estimate(destination, end), destination))
+    return None
+
+
+def bidirectional_path(height_map, start, end):
+    forward = array("i", [-1]) * len(height_map)
+    backward = array("i", [-1]) * len(height_map)
+    forward[start] = start
+    backward[end] = end
+    if start == end:
+        return [start]
+    forward_frontier = [start]
+    backward_frontier = [end]
+    while forward_frontier and backward_frontier:
+        # Expanding the smaller frontier one full level at a time keeps the first meeting point on a shortest path.
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_frontier(
+                forward_frontier, forward, backward, height_map.get_possible_destinations
+            )
+        else:
+            backward_frontier, meeting = expand_frontier(
+                backward_frontier, backward, forward, height_map.get_possible_origins
+            )
+        if meeting is not None:
+            return trace_path(forward, meeting) + trace_path(backward, meeting)[-2::-1]
+    return None
+
+
+def expand_frontier(frontier, parents, other_parents, get_neighbors):
+    next_frontier = []
+    for current in frontier:
+        for neighbor in get_neighbors(current):
+            if parents[neighbor] < 0:
+                parents[neighbor] = current
+                if other_parents[neighbor] >= 0:
+                    return next_frontier, neighbor
+                next_frontier.append(neighbor)
+    return next_frontier, None
+
+
+STRATEGIES = {"bfs": breadth_first_path, "a*": a_star_path, "bidirectional": bidirectional_path}
 
 
 if __name__ == "__main__":
-    lines = read_lines("data/day12.txt")
+    lines = read_lines("data/day12.txt", kind=bytes)
     grid = Grid(lines)
     start = next(grid.find("S"))
     end = next(grid.find("E"))
     grid[start] = "a"
     grid[end] = "z"
-    n_steps = (compute_n_steps(HeightMap(grid), s, end) for s in grid.find("a"))
-    print(f"The fewest number of steps is {min(v for v in n_steps if v is not None)}")
+    distances = compute_distances(HeightMap(grid), end)
+    print(f"The fewest number of steps from the start is {distances[start]}")
+    n_steps = min(distances[i] for i in grid.find("a") if distances[i] >= 0)
+    print(f"The fewest number of steps from any square with elevation a is {n_steps}")
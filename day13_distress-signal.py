@@ -1,14 +1,70 @@
+import re
+from functools import cmp_to_key
 from itertools import chain
+from math import prod
 
 from file import read_lines
 
+TOKEN = re.compile(r"[\[\],]|\d+|(?P<invalid>.)", re.DOTALL)
+
+
+def tokenize(line):
+    for match in TOKEN.finditer(line):
+        if match.lastgroup == "invalid":
+            raise ValueError(f"Invalid character {match.group()!r} in packet: {line!r}")
+        token = match.group()
+        yield token if token in "[]," else int(token)
+
+
+def validate_tokens(line):
+    depth = 0
+    previous = None
+    for token in tokenize(line):
+        if previous == "]" and depth == 0:
+            raise ValueError(f"Trailing data after packet: {line!r}")
+        after_element = previous == "]" or isinstance(previous, int)
+        if token == ",":
+            if not after_element:
+                raise ValueError(f"Misplaced separator in packet: {line!r}")
+        elif token == "]":
+            if depth == 0:
+                raise ValueError(f"Unbalanced packet: {line!r}")
+            if previous == ",":
+                raise ValueError(f"Misplaced separator in packet: {line!r}")
+            depth -= 1
+            yield token
+        else:
+            if after_element:
+                raise ValueError(f"Missing separator in packet: {line!r}")
+            if token == "[":
+                depth += 1
+            elif depth == 0:
+                raise ValueError(f"Packet is not a list: {line!r}")
+            yield token
+        previous = token
+    if previous != "]" or depth != 0:
+        raise ValueError(f"Malformed packet: {line!r}")
+
+
+def parse_packet(line):
+    stack = [[]]
+    for token in validate_tokens(line):
+        if token == "[":
+            stack.append([])
+        elif token == "]":
+            completed = stack.pop()
+            stack[-1].append(completed)
+        else:
+            stack[-1].append(token)
+    return stack[0][0]
+
 
 def parse_packets(lines):
     for line in lines:
         if line == "":
             yield None
             continue
-        yield eval(line)
+        yield parse_packet(line)
 
 
 def create_pairs(packets):
@@ -21,28 +77,53 @@ def create_pairs(packets):
         pair.append(packet)
 
 
+def packet_tokens(packet):
+    stack = [iter([packet])]
+    while stack:
+        for element in stack[-1]:
+            if isinstance(element, list):
+                yield "["
+                stack.append(iter(element))
+                break
+            yield element
+        else:
+            stack.pop()
+            if stack:
+                yield "]"
+
+
+def compare_tokens(left_tokens, right_tokens):
+    left_pending = []
+    right_pending = []
+    while True:
+        left = left_pending.pop() if left_pending else next(left_tokens, None)
+        right = right_pending.pop() if right_pending else next(right_tokens, None)
+        if left is None or right is None:
+            return None
+        if left == right:
+            continue
+        if left == "]":
+            return True
+        if right == "]":
+            return False
+        # An int compared with a list acts as a singleton list: the "[" just read
+        # on the other side is matched, the int and a closing "]" are replayed.
+        if left == "[":
+            right_pending += ["]", right]
+            continue
+        if right == "[":
+            left_pending += ["]", left]
+            continue
+        return left < right
+
+
 def check_order(left, right):
-    in_order = None
-    for left_element, right_element in zip(left, right):
-        if isinstance(left_element, list) and isinstance(right_element, list):
-            in_order = check_order(left_element, right_element)
-        if isinstance(left_element, int) and isinstance(right_element, list):
-            in_order = check_order([left_element], right_element)
-        if isinstance(left_element, list) and isinstance(right_element, int):
-            in_order = check_order(left_element, [right_element])
-        if isinstance(left_element, int) and isinstance(right_element, int):
-            if left_element < right_element:
-                in_order = True
-            if left_element > right_element:
-                in_order = False
-        if in_order is not None:
-            break
-    if in_order is None:
-        if len(left) < len(right):
-            in_order = True
-        if len(left) > len(right):
-            in_order = False
-    return in_order
+    return compare_tokens(packet_tokens(left), packet_tokens(right))
+
+
+def check_order_lines(left, right):
+    # Tokens are only validated as far as the comparison reads them.
+    return compare_tokens(validate_tokens(left), validate_tokens(right))
 
 
 def check_orders(pairs):
@@ -50,26 +131,29 @@ def check_orders(pairs):
         yield check_order(left, right)
 
 
+def compare_packets(left, right):
+    in_order = check_order(left, right)
+    if in_order is None:
+        return 0
+    return -1 if in_order else 1
+
+
 def order_packets(packets):
-    ordered = [next(packets)]
+    return sorted((p for p in packets if p is not None), key=cmp_to_key(compare_packets))
+
+
+def compute_decoder_key(packets, dividers):
+    positions = [1 + sum(check_order(other, d) is True for other in dividers) for d in dividers]
     for packet in packets:
         if packet is None:
             continue
-        i = 0
-        for ordered_packet in ordered:
-            if not check_order(packet, ordered_packet):
-                break
-            i += 1
-        ordered.insert(i, packet)
-    return ordered
+        for i, divider in enumerate(dividers):
+            if check_order(packet, divider):
+                positions[i] += 1
+    return prod(positions)
 
 
 if __name__ == "__main__":
     lines = read_lines("data/day13.txt")
     packets = parse_packets(lines)
-    divider = [[[2]], [[6]]]
-    key = 1
-    for i, packet in enumerate(reversed(order_packets(chain(packets, divider))), start=1):
-        if packet in divider:
-            key *= i
-    print(key)
+    print(compute_decoder_key(packets, dividers=[[[2]], [[6]]]))
@@ -1,9 +1,9 @@
-import math
 from dataclasses import dataclass
+from enum import IntEnum
 from functools import cached_property
 from itertools import tee
 
-from file import read_lines
+from file import CHUNK_SIZE, read_lines
 
 
 @dataclass(frozen=True)
@@ -11,10 +11,6 @@ class Point:
     x: int
     y: int
 
-    @property
-    def length(self):
-        return math.sqrt(self.x**2 + self.y**2)
-
     def __abs__(self):
         return Point(abs(self.x), abs(self.y))
 
@@ -30,34 +26,21 @@ class Segment:
     start: Point
     end: Point
 
-    @property
-    def length(self):
-        return (self.start - self.end).length
-
-    def __contains__(self, point):
-        return point in self.points
-
     @property
     def nodes(self):
         return {self.start, self.end}
 
-    @cached_property
-    def points(self):
-        points = set()
-        difference = self.end - self.start
-        if abs(difference).x > abs(difference).y:
-            for x in range(round(difference.length) + 1):
-                if self.end.x >= self.start.x:
-                    points.add(self.start + Point(x, 0))
-                else:
-                    points.add(self.start - Point(x, 0))
+    def draw(self, raster, width, origin, value):
+        start = (self.start.y - origin.y) * width + self.start.x - origin.x
+        end = (self.end.y - origin.y) * width + self.end.x - origin.x
+        if self.start.y == self.end.y:
+            step = 1
+        elif self.start.x == self.end.x:
+            step = width
         else:
-            for y in range(round(difference.length) + 1):
-                if self.end.y >= self.start.y:
-                    points.add(self.start + Point(0, y))
-                else:
-                    points.add(self.start - Point(0, y))
-        return points
+            raise ValueError(f"Cannot draw a segment that is not axis-aligned: {self}")
+        first, last = min(start, end), max(start, end)
+        raster[first : last + 1 : step] = bytes([value]) * ((last - first) // step + 1)
 
 
 def parse_points(lines):
@@ -85,9 +68,6 @@ def construct_segments(points):
 class Line:
     segments: list[Segment]
 
-    def __contains__(self, point):
-        return point in self.points
-
     @cached_property
     def nodes(self):
         nodes = set()
@@ -95,21 +75,11 @@ class Line:
             nodes.update(segment.nodes)
         return nodes
 
-    @cached_property
-    def points(self):
-        points = set()
-        for segment in self.segments:
-            points.update(segment.points)
-        return points
-
 
 @dataclass(frozen=True)
 class Scan:
     lines: list[Line]
 
-    def __contains__(self, point):
-        return point in self.points
-
     @cached_property
     def nodes(self):
         nodes = set()
@@ -117,13 +87,6 @@ class Scan:
             nodes.update(line.nodes)
         return nodes
 
-    @cached_property
-    def points(self):
-        points = set()
-        for line in self.lines:
-            points.update(line.points)
-        return points
-
     @cached_property
     def upper_left(self):
         x = min(n.x for n in self.nodes)
@@ -136,17 +99,16 @@ class Scan:
         y = max(n.y for n in self.nodes)
         return Point(x, y)
 
+    def draw(self, raster, width, origin, value):
+        for line in self.lines:
+            for segment in line.segments:
+                segment.draw(raster, width, origin, value)
+
     def __str__(self):
-        lines = []
-        for y in range(self.upper_left.y, self.lower_right.y + 1):
-            line = ""
-            for x in range(self.upper_left.x, self.lower_right.x + 1):
-                if Point(x, y) in self:
-                    line += "#"
-                else:
-                    line += "."
-            lines.append(line)
-        return "\n".join(lines)
+        width = self.lower_right.x - self.upper_left.x + 1
+        raster = bytearray(b".") * (width * (self.lower_right.y - self.upper_left.y + 1))
+        self.draw(raster, width, self.upper_left, ord("#"))
+        return "\n".join(raster[i : i + width].decode() for i in range(0, len(raster), width))
 
 
 def construct_lines(segments):
@@ -159,44 +121,109 @@ def construct_lines(segments):
         line_segments.append(segment)
 
 
-def in_abyss(scan, position):
-    return position.x < scan.upper_left.x or position.x > scan.lower_right.x or position.y > scan.lower_right.y
+class Tile(IntEnum):
+    AIR = 0
+    ROCK = 1
+    SAND = 2
+    ABYSS = 3
 
 
-def get_resting_sand(scan, start):
-    resting_sand = set()
-    position = start
-    while not in_abyss(scan, position):
-        down = position - Point(0, -1)
-        if down not in scan and down not in resting_sand:
-            position = down
-            continue
-        diagonally_left = position - Point(1, -1)
-        if diagonally_left not in scan and diagonally_left not in resting_sand:
-            position = diagonally_left
-            continue
-        diagonally_right = position - Point(-1, -1)
-        if diagonally_right not in scan and diagonally_right not in resting_sand:
-            position = diagonally_right
-            continue
-        resting_sand.add(position)
-        if position == start:
+CAVE_CHARACTERS = bytes.maketrans(bytes(Tile), b".#o~")
+CAVE_GRAYS = bytes.maketrans(bytes(Tile), bytes([0, 128, 255, 64]))
+
+
+class Cave:
+    def __init__(self, scan, source, floor=None):
+        self.floor = floor
+        self.top = min(source.y, scan.upper_left.y)
+        if floor is None:
+            self.left = min(scan.upper_left.x, source.x) - 1
+            right = max(scan.lower_right.x, source.x) + 1
+            bottom = max(scan.lower_right.y, source.y) + 1
+        else:
+            depth = floor - source.y
+            self.left = min(scan.upper_left.x, source.x - depth) - 1
+            right = max(scan.lower_right.x, source.x + depth) + 1
+            bottom = floor
+        self.width = right - self.left + 1
+        self.height = bottom - self.top + 1
+        self.cells = bytearray(self.width * self.height)
+        edge = Tile.ABYSS if floor is None else Tile.ROCK
+        self.cells[-self.width :] = bytes([edge]) * self.width
+        if floor is None:
+            self.cells[:: self.width] = bytes([Tile.ABYSS]) * self.height
+            self.cells[self.width - 1 :: self.width] = bytes([Tile.ABYSS]) * self.height
+        scan.draw(self.cells, self.width, Point(self.left, self.top), Tile.ROCK)
+
+    def index(self, point):
+        return (point.y - self.top) * self.width + point.x - self.left
+
+    def __getitem__(self, point):
+        return Tile(self.cells[self.index(point)])
+
+    def __str__(self):
+        text = self.cells.translate(CAVE_CHARACTERS).decode()
+        return "\n".join(text[i : i + self.width] for i in range(0, len(text), self.width))
+
+    def write_pgm(self, file, chunk_size=CHUNK_SIZE):
+        file.write(b"P5\n%d %d\n255\n" % (self.width, self.height))
+        for i in range(0, len(self.cells), chunk_size):
+            file.write(self.cells[i : i + chunk_size].translate(CAVE_GRAYS))
+
+
+def get_resting_sand(cave, start):
+    cells = cave.cells
+    width = cave.width
+    n_resting = 0
+    # Each grain follows the previous one until the cell where that one came to rest,
+    # so the next grain can start from the last open position on the previous path.
+    path = [cave.index(start)]
+    while path:
+        position = path[-1]
+        if cells[position] == Tile.ABYSS:
             break
-        position = start
-    return resting_sand
+        for destination in (position + width, position + width - 1, position + width + 1):
+            if cells[destination] == Tile.AIR or cells[destination] == Tile.ABYSS:
+                path.append(destination)
+                break
+        else:
+            cells[path.pop()] = Tile.SAND
+            n_resting += 1
+    return n_resting
+
+
+def sweep_resting_sand(cave, start, fill=False):
+    if cave.floor is None:
+        raise ValueError("The row sweep requires a cave with a floor")
+    width = cave.width
+    all_columns = (1 << width) - 1
+    to_bits = bytes.maketrans(bytes(Tile), b"0100")
+    to_sand = bytes.maketrans(b"01", bytes([Tile.AIR, Tile.SAND]))
+    filled = 1 << (start.x - cave.left)
+    n_resting = 0
+    for y in range(start.y, cave.floor):
+        start_index = (y - cave.top) * width
+        row = cave.cells[start_index : start_index + width]
+        if y > start.y:
+            # A cell fills when any of the three cells above it is filled, unless it is rock.
+            rock_columns = int(row.translate(to_bits)[::-1], 2)
+            filled = (filled | filled << 1 | filled >> 1) & all_columns & ~rock_columns
+        n_resting += filled.bit_count()
+        if fill:
+            sand = format(filled, f"0{width}b")[::-1].encode().translate(to_sand)
+            merged = int.from_bytes(row, "big") | int.from_bytes(sand, "big")
+            cave.cells[start_index : start_index + width] = merged.to_bytes(width, "big")
+    return n_resting
 
 
 def main():
     text_lines = read_lines("data/day14.txt")
     points = parse_points(text_lines)
     segments = construct_segments(points)
-    lines = list(construct_lines(segments))
-    lower_edge = max(n.y for l in lines for n in l.nodes)
-    floor = Line([Segment(Point(0, lower_edge + 2), Point(1_0000, lower_edge + 2))])
-    lines += [floor]
-    scan = Scan(lines)
-    resting_sand = get_resting_sand(scan, start=Point(500, 0))
-    print(f"{len(resting_sand)} units of sand came to rest")
+    scan = Scan(list(construct_lines(segments)))
+    cave = Cave(scan, source=Point(500, 0), floor=scan.lower_right.y + 2)
+    n_resting = sweep_resting_sand(cave, start=Point(500, 0))
+    print(f"{n_resting} units of sand came to rest")
 
 
 if __name__ == "__main__":
@@ -1,26 +1,55 @@
-with open("data/day6.txt", "r") as file:
-    puzzle_input = file.readline()
+from file import open_binary, read_chunks
 
 
-class Buffer:
+class MarkerDetector:
     def __init__(self, length):
         self.length = length
-        self._buffer = []
+        self._window = bytearray(length)
+        self._counts = [0] * 256
+        self._n_distinct = 0
+        self.n_received = 0
 
     def append(self, value):
-        self._buffer.append(value)
-        while len(self._buffer) > self.length:
-            del self._buffer[0]
+        i = self.n_received % self.length
+        if self.n_received >= self.length:
+            dropped = self._window[i]
+            self._counts[dropped] -= 1
+            if self._counts[dropped] == 0:
+                self._n_distinct -= 1
+        self._window[i] = value
+        if self._counts[value] == 0:
+            self._n_distinct += 1
+        self._counts[value] += 1
+        self.n_received += 1
+        return self.found
 
-    def __iter__(self):
-        return iter(self._buffer)
+    @property
+    def found(self):
+        return self._n_distinct == self.length
+
+    @property
+    def window(self):
+        i = self.n_received % self.length
+        return bytes(self._window[i:] + self._window[:i])
+
+
+def find_markers(chunks, lengths):
+    detectors = [MarkerDetector(length) for length in lengths]
+    for chunk in chunks:
+        for value in chunk:
+            found = False
+            for detector in detectors:
+                found |= detector.append(value)
+            if not found:
+                continue
+            for detector in [d for d in detectors if d.found]:
+                detectors.remove(detector)
+                yield detector.length, detector.n_received, detector.window
+            if not detectors:
+                return
 
 
 if __name__ == "__main__":
-    length = 14
-    buffer = Buffer(length=length)
-    for i, char in enumerate(puzzle_input):
-        buffer.append(char)
-        if len(set(buffer)) == length:
-            print(f"Start-of-packet marker '{''.join(buffer)}' received after {i + 1} characters")
-            break
+    with open_binary("data/day6.txt") as file:
+        for length, n_received, marker in find_markers(read_chunks(file), lengths=[4, 14]):
+            print(f"Marker of length {length} '{marker.decode()}' received after {n_received} characters")
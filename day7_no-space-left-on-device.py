@@ -1,75 +1,166 @@
-from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 
+from file import read_lines
 
-class Element(ABC):
-    def __init__(self, name, parent=None):
-        self.name = name
-        self.parent = parent
+ROOT = 0
 
-    @property
-    @abstractmethod
-    def size(self):
-        pass
 
-    def __repr__(self):
-        return f"Element(name={self.name}, parent={self.parent})"
+class Directory:
+    __slots__ = ("file_system", "index")
 
-
-class File(Element):
-    def __init__(self, name, parent, size):
-        super().__init__(name, parent)
-        self._size = size
+    def __init__(self, file_system, index):
+        self.file_system = file_system
+        self.index = index
 
     @property
-    def size(self):
-        return self._size
+    def name(self):
+        return self.file_system.names[self.file_system.name_ids[self.index]]
 
-
-class Directory(Element):
-    def __init__(self, name, parent=None):
-        super().__init__(name, parent)
-        self._elements = []
+    @property
+    def parent(self):
+        parent = self.file_system.parents[self.index]
+        if parent < 0:
+            return None
+        return Directory(self.file_system, parent)
 
     @property
     def size(self):
-        return sum(e.size for e in self._elements)
-
-    def add(self, element):
-        self._elements.append(element)
+        return self.file_system.sizes[self.index]
 
     @property
     def directories(self):
-        directories = (e for e in self._elements if isinstance(e, Directory))
-        for directory in directories:
-            yield directory
-            yield from directory.directories
+        for index in self.file_system.descendants(self.index):
+            yield Directory(self.file_system, index)
+
+    def __repr__(self):
+        return f"Directory(name={self.name}, parent={self.parent})"
 
 
-root_directory = Directory("/")
-current_directory = root_directory
-with open("data/day7.txt", "r") as file:
-    for line in file:
-        split_line = line.strip().split(" ")
+class FileSystem:
+    def __init__(self):
+        self.names = []
+        self._name_ids = {}
+        self.name_ids = array("q")
+        self.parents = array("q")
+        self.sizes = array("q")
+        self._directories = {}
+        self._files = set()
+        self._create(-1, self.intern("/"))
+
+    def __len__(self):
+        return len(self.parents)
+
+    @property
+    def root(self):
+        return Directory(self, ROOT)
+
+    @property
+    def directories(self):
+        for index in range(len(self)):
+            yield Directory(self, index)
+
+    def intern(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def _create(self, parent, name_id):
+        index = len(self)
+        self.name_ids.append(name_id)
+        self.parents.append(parent)
+        self.sizes.append(0)
+        return index
+
+    def directory(self, parent, name):
+        name_id = self.intern(name)
+        key = parent << 32 | name_id
+        index = self._directories.get(key)
+        if index is None:
+            index = self._directories[key] = self._create(parent, name_id)
+        return index
+
+    def add_file(self, parent, name, size):
+        key = parent << 32 | self.intern(name)
+        if key in self._files:
+            return
+        self._files.add(key)
+        while parent >= 0:
+            self.sizes[parent] += size
+            parent = self.parents[parent]
+
+    def descendants(self, index):
+        inside = bytearray(len(self))
+        inside[index] = 1
+        for i in range(index + 1, len(self)):
+            if inside[self.parents[i]]:
+                inside[i] = 1
+                yield i
+
+
+def parse_terminal(lines):
+    file_system = FileSystem()
+    current = ROOT
+    for line in lines:
+        split_line = line.split(" ")
         if split_line[0] == "dir":
+            file_system.directory(current, split_line[1])
             continue
         if split_line[0].isnumeric():
             size, filename = split_line
-            current_directory.add(File(filename, current_directory, int(size)))
+            file_system.add_file(current, filename, int(size))
         if split_line[0] == "$":
             if split_line[1] == "ls":
                 continue
             destination = split_line[2]
-            if destination == "..":
-                current_directory = current_directory.parent
-                continue
-            destination_directory = Directory(destination, parent=current_directory)
-            current_directory.add(destination_directory)
-            current_directory = destination_directory
-
-cap = 100_000
-total = sum(d.size for d in root_directory.directories if d.size < cap)
-print(f"The total size of all directories with a size of at most {cap:,} is {total:,}")
-
-required = 30_000_000 - (70_000_000 - root_directory.size)
-smallest = min(d.size for d in root_directory.directories if d.size > required)
-print(f"The smallest directory that has the required size of {required:,} has a size of {smallest:,}")
+            if destination == "/":
+                current = ROOT
+            elif destination == "..":
+                if current != ROOT:
+                    current = file_system.parents[current]
+            else:
+                current = file_system.directory(current, destination)
+    return file_system
+
+
+class SizeIndex:
+    def __init__(self, file_system):
+        self.file_system = file_system
+        self._order = sorted(range(len(file_system)), key=file_system.sizes.__getitem__)
+        self.sizes = array("q", (file_system.sizes[i] for i in self._order))
+        self._totals = array("q", accumulate(self.sizes, initial=0))
+
+    def _directories(self, start, stop):
+        for i in self._order[start:stop]:
+            yield Directory(self.file_system, i)
+
+    def smallest_at_least(self, size):
+        i = bisect_left(self.sizes, size)
+        if i == len(self.sizes):
+            return None
+        return Directory(self.file_system, self._order[i])
+
+    def between(self, low, high):
+        return self._directories(bisect_left(self.sizes, low), bisect_right(self.sizes, high))
+
+    def total_below(self, size):
+        return self._totals[bisect_left(self.sizes, size)]
+
+    def largest(self, k):
+        return reversed(list(self._directories(max(len(self.sizes) - k, 0), len(self.sizes))))
+
+
+if __name__ == "__main__":
+    file_system = parse_terminal(read_lines("data/day7.txt"))
+    size_index = SizeIndex(file_system)
+
+    cap = 100_000
+    total = size_index.total_below(cap)
+    print(f"The total size of all directories with a size of at most {cap:,} is {total:,}")
+
+    required = 30_000_000 - (70_000_000 - file_system.root.size)
+    smallest = size_index.smallest_at_least(required + 1).size
+    print(f"The smallest directory that has the required size of {required:,} has a size of {smallest:,}")
@@ -1,51 +1,100 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from array import array
+
+from file import read_lines
+
+DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+
 class Grid:
-    def __init__(self, n_rows, n_cols, initial=0):
-        self._grid = [[initial for _ in range(n_cols)] for _ in range(n_rows)]
+    def __init__(self, n_rows, n_cols, initial=0, typecode="q"):
+        self._data = array(typecode, [initial]) * (n_rows * n_cols)
+        self._shape = (n_rows, n_cols)
 
-    def __getitem__(self, position):
+    @classmethod
+    def _from_data(cls, data, n_cols):
+        grid = cls.__new__(cls)
+        grid._data = data
+        grid._shape = (len(data) // n_cols if n_cols else 0, n_cols)
+        return grid
+
+    def _index(self, position):
         i_row, i_col = position
-        return self._grid[i_row][i_col]
+        n_rows, n_cols = self._shape
+        if i_row < 0:
+            i_row += n_rows
+        if i_col < 0:
+            i_col += n_cols
+        if not (0 <= i_row < n_rows and 0 <= i_col < n_cols):
+            raise IndexError(f"Grid index {position} out of range for shape {self._shape}")
+        return i_row * n_cols + i_col
+
+    def __getitem__(self, position):
+        return self._data[self._index(position)]
 
     def __setitem__(self, position, value):
-        i_row, i_col = position
-        self._grid[i_row][i_col] = value
+        self._data[self._index(position)] = value
 
     @property
     def shape(self):
-        return (len(self._grid), len(self._grid[0]))
+        return self._shape
+
+    @property
+    def strides(self):
+        return (self._shape[1], 1)
+
+    @property
+    def data(self):
+        return memoryview(self._data)
 
     @classmethod
-    def from_iterable(cls, iterable):
-        raw = [list(row) for row in iterable]
-        assert len({len(row) for row in raw}) == 1, "Rows have different lengths"
-        grid = Grid(len(raw), len(raw[0]))
-        for i_row, row in enumerate(raw):
-            for i_col, value in enumerate(row):
-                grid[i_row, i_col] = value
-        return grid
+    def from_iterable(cls, iterable, typecode="q"):
+        data = array(typecode)
+        n_cols = None
+        for row in iterable:
+            start = len(data)
+            data.extend(row)
+            if n_cols is None:
+                n_cols = len(data) - start
+            assert len(data) - start == n_cols, "Rows have different lengths"
+        return cls._from_data(data, n_cols or 0)
+
+    @classmethod
+    def from_digits(cls, lines):
+        data = array("b")
+        n_cols = None
+        for line in lines:
+            if n_cols is None:
+                n_cols = len(line)
+            assert len(line) == n_cols, "Rows have different lengths"
+            data.frombytes(line.translate(DIGITS))
+        return cls._from_data(data, n_cols or 0)
 
     @property
     def rows(self):
-        for row in self._grid:
-            yield row
+        view = self.data
+        n_cols = self._shape[1]
+        for start in range(0, len(view), n_cols):
+            yield view[start : start + n_cols]
 
     @property
     def cols(self):
-        for i_col in range(self.shape[1]):
-            yield [row[i_col] for row in self._grid]
+        view = self.data
+        for i_col in range(self._shape[1]):
+            yield view[i_col :: self._shape[1]]
 
     def sum(self):
-        return sum(sum(row) for row in self._grid)
+        return sum(self._data)
 
     def max(self):
-        return max(max(row) for row in self._grid)
+        return max(self._data)
 
 
-trees = []
-with open("data/day8.txt", "r") as file:
-    for line in file.readlines():
-        trees.append([int(s) for s in line.strip()])
-trees = Grid.from_iterable(trees)
+trees = Grid.from_digits(read_lines("data/day8.txt", kind=bytes))
 
 
 def visible_trees(view):
@@ -62,32 +111,71 @@ def bidirectional_visible_trees(view):
         yield -i - 1
 
 
-visibility = Grid(*trees.shape, initial=False)
-for i_row, row in enumerate(trees.rows):
-    for i_col in bidirectional_visible_trees(row):
-        visibility[i_row, i_col] = True
-for i_col, col in enumerate(trees.cols):
-    for i_row in bidirectional_visible_trees(col):
-        visibility[i_row, i_col] = True
+def compute_visibility(trees):
+    visibility = Grid(*trees.shape, initial=False, typecode="b")
+    for i_row, row in enumerate(trees.rows):
+        for i_col in bidirectional_visible_trees(row):
+            visibility[i_row, i_col] = True
+    for i_col, col in enumerate(trees.cols):
+        for i_row in bidirectional_visible_trees(col):
+            visibility[i_row, i_col] = True
+    return visibility
+
+
+def visible_from_start(heights, axis):
+    tallest = np.maximum.accumulate(heights, axis=axis)
+    shifted = np.full_like(tallest, -1)
+    if axis == 0:
+        shifted[1:] = tallest[:-1]
+    else:
+        shifted[:, 1:] = tallest[:, :-1]
+    return heights > shifted
+
+
+def compute_visibility_array(trees):
+    heights = np.asarray(trees.data).reshape(trees.shape)
+    visibility = visible_from_start(heights, axis=0) | visible_from_start(heights, axis=1)
+    visibility |= visible_from_start(heights[::-1], axis=0)[::-1]
+    visibility |= visible_from_start(heights[:, ::-1], axis=1)[:, ::-1]
+    return visibility
+
+
+if np is not None:
+    visibility = compute_visibility_array(trees)
+else:
+    visibility = compute_visibility(trees)
 print(f"{visibility.sum()} trees are visible from outside the grid")
 
 
-def compute_scenic_score(tree, view):
-    visible_trees = 0
-    for other_tree in view:
-        visible_trees += 1
-        if other_tree >= tree:
-            break
-    return visible_trees
-
-
-scenic_score = Grid(*trees.shape, initial=1)
-for i_row, row in enumerate(trees.rows):
-    for i_col, tree in enumerate(row):
-        scenic_score[i_row, i_col] *= compute_scenic_score(tree, row[i_col + 1 :])
-        scenic_score[i_row, i_col] *= compute_scenic_score(tree, reversed(row[:i_col]))
-for i_col, col in enumerate(trees.cols):
-    for i_row, tree in enumerate(col):
-        scenic_score[i_row, i_col] *= compute_scenic_score(tree, col[i_row + 1 :])
-        scenic_score[i_row, i_col] *= compute_scenic_score(tree, reversed(col[:i_row]))
+def line_scenic_scores(view):
+    n_trees = len(view)
+    forward = [0] * n_trees
+    backward = [0] * n_trees
+    blocking = []
+    for i in reversed(range(n_trees)):
+        while blocking and view[blocking[-1]] < view[i]:
+            blocking.pop()
+        forward[i] = (blocking[-1] if blocking else n_trees - 1) - i
+        blocking.append(i)
+    blocking.clear()
+    for i in range(n_trees):
+        while blocking and view[blocking[-1]] < view[i]:
+            blocking.pop()
+        backward[i] = i - (blocking[-1] if blocking else 0)
+        blocking.append(i)
+    return [f * b for f, b in zip(forward, backward)]
+
+
+def compute_scenic_scores(trees):
+    scenic_score = Grid(*trees.shape, initial=1)
+    for i_row, row in enumerate(trees.rows):
+        for i_col, score in enumerate(line_scenic_scores(row)):
+            scenic_score[i_row, i_col] *= score
+    for i_col, col in enumerate(trees.cols):
+        for i_row, score in enumerate(line_scenic_scores(col)):
+            scenic_score[i_row, i_col] *= score
+    return scenic_score
+
+
+scenic_score = compute_scenic_scores(trees)
 print(f"The highest scenic score possible for any tree is: {scenic_score.max()}")
@@ -1,5 +1,5 @@
-import math
-import operator
+from array import array
+from collections import Counter
 from dataclasses import dataclass
 from enum import Enum
 
@@ -19,76 +19,200 @@ class Command:
     distance: int
 
 
-def parse_directions(lines):
+MAX_BITMAP_CELLS = 1 << 30
+BITMAP_CELLS_PER_STEP = 64
+MOVES = {Direction.UP: (0, 1), Direction.RIGHT: (1, 0), Direction.DOWN: (0, -1), Direction.LEFT: (-1, 0)}
+
+
+def parse_commands(lines):
     direction_map = {"U": Direction.UP, "R": Direction.RIGHT, "D": Direction.DOWN, "L": Direction.LEFT}
     for line in lines:
         direction, distance = line.split(" ")
-        for _ in range(int(distance)):
-            yield direction_map[direction]
-
-
-@dataclass(frozen=True)
-class Vector:
-    x: int
-    y: int
-
-    def __add__(self, other):
-        return Vector(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other):
-        return Vector(self.x - other.x, self.y - other.y)
-
-    @property
-    def length(self):
-        return math.sqrt(self.x**2 + self.y**2)
+        yield Command(direction_map[direction], int(distance))
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+def measure_path(commands, initial):
+    x, y = initial
+    x_min = x_max = x
+    y_min = y_max = y
+    n_steps = 0
+    for command in commands:
+        dx, dy = MOVES[command.direction]
+        x += dx * command.distance
+        y += dy * command.distance
+        n_steps += command.distance
+        x_min, x_max = min(x_min, x), max(x_max, x)
+        y_min, y_max = min(y_min, y), max(y_max, y)
+    return (x_min, y_min), (x_max, y_max), n_steps
+
+
+class PackedVisits:
+    offset = 1 << 31
+
+    def __init__(self, counts=False):
+        self._keys = set()
+        self._counts = Counter() if counts else None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, x, y):
+        key = (x + self.offset) << 32 | (y + self.offset)
+        self._keys.add(key)
+        if self._counts is not None:
+            self._counts[key] += 1
+
+    def add_run(self, x, y, dx, dy, n_steps):
+        key = (x + self.offset) << 32 | (y + self.offset)
+        step = (dx << 32) + dy
+        keys = range(key + step, key + (n_steps + 1) * step, step)
+        self._keys.update(keys)
+        if self._counts is not None:
+            self._counts.update(keys)
+
+    def heatmap(self):
+        mask = (1 << 32) - 1
+        for key in self._keys:
+            count = self._counts[key] if self._counts is not None else 1
+            yield (key >> 32) - self.offset, (key & mask) - self.offset, count
+
+
+BIT_IS_SET = [bytes(int(bool(value & 1 << bit)) for value in range(256)) for bit in range(8)]
+SET_BIT = [bytes(value | 1 << bit for value in range(256)) for bit in range(8)]
+
+
+class BitmapVisits:
+    def __init__(self, lower_left, upper_right, counts=False):
+        self.x_min, self.y_min = lower_left
+        self.width = upper_right[0] - self.x_min + 1
+        self.height = upper_right[1] - self.y_min + 1
+        # Rows are padded to whole bytes, so a column keeps the same bit in every row.
+        self.row_bytes = (self.width + 7) // 8
+        self._bits = bytearray(self.row_bytes * self.height)
+        self._counts = array("I", [0]) * (self.width * self.height) if counts else None
+        self._n_visited = 0
+
+    def __len__(self):
+        return self._n_visited
+
+    def add(self, x, y):
+        column = x - self.x_min
+        i = (y - self.y_min) * self.row_bytes + (column >> 3)
+        mask = 1 << (column & 7)
+        if not self._bits[i] & mask:
+            self._bits[i] |= mask
+            self._n_visited += 1
+        if self._counts is not None:
+            self._counts[(y - self.y_min) * self.width + column] += 1
+
+    def add_run(self, x, y, dx, dy, n_steps):
+        first_x, last_x = sorted((x + dx, x + n_steps * dx))
+        first_y, last_y = sorted((y + dy, y + n_steps * dy))
+        first_column, last_column = first_x - self.x_min, last_x - self.x_min
+        first_row, last_row = first_y - self.y_min, last_y - self.y_min
+        if dy == 0:
+            row = slice(
+                first_row * self.row_bytes + (first_column >> 3),
+                first_row * self.row_bytes + (last_column >> 3) + 1,
+            )
+            value = int.from_bytes(self._bits[row], "little")
+            mask = ((1 << n_steps) - 1) << (first_column & 7)
+            self._n_visited += n_steps - (value & mask).bit_count()
+            self._bits[row] = (value | mask).to_bytes(row.stop - row.start, "little")
+            cells = slice(first_row * self.width + first_column, first_row * self.width + last_column + 1)
+        else:
+            bit = first_column & 7
+            column = slice(
+                first_row * self.row_bytes + (first_column >> 3),
+                last_row * self.row_bytes + (first_column >> 3) + 1,
+                self.row_bytes,
+            )
+            run = self._bits[column]
+            self._n_visited += run.translate(BIT_IS_SET[bit]).count(0)
+            self._bits[column] = run.translate(SET_BIT[bit])
+            cells = slice(first_row * self.width + first_column, last_row * self.width + first_column + 1, self.width)
+        if self._counts is not None:
+            self._counts[cells] = array("I", map((1).__add__, self._counts[cells]))
+
+    def heatmap(self):
+        for i, value in enumerate(self._bits):
+            if not value:
+                continue
+            row, byte = divmod(i, self.row_bytes)
+            for bit in range(8):
+                if value & 1 << bit:
+                    column = byte * 8 + bit
+                    count = self._counts[row * self.width + column] if self._counts is not None else 1
+                    yield self.x_min + column, self.y_min + row, count
+
+
+class Rope:
+    def __init__(self, n_knots, initial):
+        x, y = initial
+        self.xs = [x] * n_knots
+        self.ys = [y] * n_knots
 
     @property
-    def unit(self):
-        return Vector(round(self.x / self.length), round(self.y / self.length))
-
-
-def get_head_positions(directions, initial):
-    position = initial
-    movements = {
-        Direction.UP: (operator.add, Vector(0, 1)),
-        Direction.RIGHT: (operator.add, Vector(1, 0)),
-        Direction.DOWN: (operator.sub, Vector(0, 1)),
-        Direction.LEFT: (operator.sub, Vector(1, 0)),
-    }
-    for direction in directions:
-        op, vector = movements[direction]
-        position = op(position, vector)
-        yield position
-
-
-def get_knot_positions(earlier_knot_positions, initial):
-    current_knot_position = initial
-    for earlier_knot_position in earlier_knot_positions:
-        difference = earlier_knot_position - current_knot_position
-        if difference.length < 2.0:
-            yield current_knot_position
-            continue
-        current_knot_position = current_knot_position + difference - difference.unit
-        yield current_knot_position
-
-
-def get_tail_positions(head_positions, n_knots, initial):
-    knot_positions = head_positions
-    for _ in range(n_knots - 1):
-        knot_positions = get_knot_positions(knot_positions, initial=initial)
-    for knot_position in knot_positions:
-        yield knot_position
+    def tail(self):
+        return self.xs[-1], self.ys[-1]
+
+    def step(self, dx, dy):
+        xs, ys = self.xs, self.ys
+        xs[0] += dx
+        ys[0] += dy
+        translated = True
+        for i in range(1, len(xs)):
+            difference_x = xs[i - 1] - xs[i]
+            difference_y = ys[i - 1] - ys[i]
+            if -1 <= difference_x <= 1 and -1 <= difference_y <= 1:
+                return False, False
+            step_x = sign(difference_x)
+            step_y = sign(difference_y)
+            xs[i] += step_x
+            ys[i] += step_y
+            translated = translated and step_x == dx and step_y == dy
+        return True, translated
+
+    def move(self, command, visits):
+        dx, dy = MOVES[command.direction]
+        for remaining in reversed(range(command.distance)):
+            moved, translated = self.step(dx, dy)
+            if moved:
+                visits.add(*self.tail)
+            if translated and remaining:
+                # Every knot moved by (dx, dy), so the rope's shape is unchanged and
+                # each remaining step translates it the same way.
+                visits.add_run(*self.tail, dx, dy, remaining)
+                self.xs = [x + remaining * dx for x in self.xs]
+                self.ys = [y + remaining * dy for y in self.ys]
+                return
+
+
+def track_tail(commands, n_knots, initial, visits):
+    rope = Rope(n_knots, initial)
+    visits.add(*rope.tail)
+    for command in commands:
+        rope.move(command, visits)
+    return visits
 
 
 def get_tail_positions_count(filename, n_knots, initial):
-    lines = read_lines(filename)
-    directions = parse_directions(lines)
-    head_positions = get_head_positions(directions, initial=initial)
-    tail_positions = get_tail_positions(head_positions, n_knots=n_knots, initial=initial)
-    return len(set(tail_positions))
+    # The file is read twice, once for the bounds and once for the walk, rather than held in memory.
+    (x_min, y_min), (x_max, y_max), n_steps = measure_path(parse_commands(read_lines(filename)), initial)
+    n_cells = (x_max - x_min + 1) * (y_max - y_min + 1)
+    # The bitmap costs a bit per cell of the bounding box, so it only pays off for densely covered boxes.
+    if n_cells <= min(MAX_BITMAP_CELLS, BITMAP_CELLS_PER_STEP * (n_steps + 1)):
+        visits = BitmapVisits((x_min, y_min), (x_max, y_max))
+    else:
+        visits = PackedVisits()
+    return len(track_tail(parse_commands(read_lines(filename)), n_knots, initial, visits))
 
 
 if __name__ == "__main__":
     for n_knots in [2, 10]:
-        n_tail_positions = get_tail_positions_count("data/day9.txt", n_knots=n_knots, initial=Vector(0, 0))
+        n_tail_positions = get_tail_positions_count("data/day9.txt", n_knots=n_knots, initial=(0, 0))
         print(f"The tail of a rope with {n_knots} knots visited {n_tail_positions} positions at least once")
@@ -1,4 +1,89 @@
-def read_lines(filename):
-    with open(filename) as file:
-        for line in file.readlines():
-            yield line.strip()
+import gzip
+import mmap
+import os
+import sys
+from contextlib import nullcontext
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+
+
+def open_binary(filename):
+    filename = os.fspath(filename)
+    if filename == "-":
+        return nullcontext(sys.stdin.buffer)
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rb")
+    return open(filename, "rb")
+
+
+def read_chunks(file, chunk_size=CHUNK_SIZE):
+    while chunk := file.read(chunk_size):
+        yield chunk
+
+
+def split_lines(chunks):
+    pieces = []
+    for chunk in chunks:
+        first, *lines = chunk.split(b"\n")
+        pieces.append(first)
+        if not lines:
+            continue
+        yield b"".join(pieces)
+        *lines, last = lines
+        yield from lines
+        pieces = [last]
+    remainder = b"".join(pieces)
+    if remainder:
+        yield remainder
+
+
+def strip_view(view):
+    start, end = 0, len(view)
+    while start < end and view[start] in WHITESPACE:
+        start += 1
+    while end > start and view[end - 1] in WHITESPACE:
+        end -= 1
+    if start == 0 and end == len(view):
+        return view
+    stripped = view[start:end]
+    view.release()
+    return stripped
+
+
+def map_lines(filename):
+    filename = os.fspath(filename)
+    if filename == "-" or filename.endswith(".gz"):
+        raise ValueError(f"Cannot memory-map {filename!r}, read it as str or bytes lines instead")
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        start = 0
+        while start < len(mapped):
+            end = mapped.find(b"\n", start)
+            if end == -1:
+                end = len(mapped)
+            yield strip_view(view[start:end])
+            start = end + 1
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            # The caller still holds some of the lines; the map is closed once they are dropped.
+            pass
+
+
+def read_lines(filename, kind=str, chunk_size=CHUNK_SIZE):
+    if kind is memoryview:
+        yield from map_lines(filename)
+        return
+    if kind not in (str, bytes):
+        raise ValueError(f"Unsupported line type: {kind!r}")
+    with open_binary(filename) as file:
+        for line in split_lines(read_chunks(file, chunk_size)):
+            line = line.strip()
+            yield line.decode() if kind is str else line
@@ -0,0 +1,25 @@
+import importlib.util
+from pathlib import Path
+
+spec = importlib.util.spec_from_file_location("day14", Path(__file__).with_name("day14_regolith-reservoir.py"))
+day14 = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(day14)
+
+
+def build_scan(text_lines):
+    points = day14.parse_points(text_lines)
+    segments = day14.construct_segments(points)
+    return day14.Scan(list(day14.construct_lines(segments)))
+
+
+def test_example():
+    scan = build_scan(["498,4 -> 498,6 -> 496,6", "503,4 -> 502,4 -> 502,9 -> 494,9"])
+    source = day14.Point(500, 0)
+    assert day14.get_resting_sand(day14.Cave(scan, source), source) == 24
+    assert day14.sweep_resting_sand(day14.Cave(scan, source, floor=scan.lower_right.y + 2), source) == 93
+
+
+def test_source_outside_rock_bounds_falls_into_abyss():
+    scan = build_scan(["485,5 -> 492,5"])
+    source = day14.Point(500, 0)
+    assert day14.get_resting_sand(day14.Cave(scan, source), source) == 0